@@ -6,8 +6,16 @@ import logging
 import json
 import os
 import tempfile
+import threading
+from functools import wraps
 from datetime import datetime, timedelta
 
+from game_engine import GRID_SIZE, SHIP_SIZES, random_bot_ships, resolve_shot, ship_cells
+from game_archive import archive_game, aggregate_archive, should_archive
+from rate_limit import RateLimiter, MemoryBackend, FileBackend, retry_after_seconds
+from game_table import SharedGameTable
+from storage_recovery import recover_storage, TEMP_SUFFIX
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,26 +26,102 @@ app.secret_key = 'battleship_secure_key_2025'  # Use a fixed secret key
 # Add session lifetime configuration (30 minutes)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
 
-GRID_SIZE = 10
-SHIP_SIZES = {
-    'carrier': 5,
-    'battleship': 4,
-    'cruiser': 3,
-    'submarine': 3,
-    'destroyer': 2
-}
-
 # Create a directory for game storage
 GAME_STORAGE_DIR = os.path.join(tempfile.gettempdir(), 'battleship_games')
 os.makedirs(GAME_STORAGE_DIR, exist_ok=True)
 logger.debug(f"Game storage directory: {GAME_STORAGE_DIR}")
 
+# Games with no activity for this long are cleaned up
+INACTIVE_THRESHOLD = 60 * 60  # 60 minutes
+
+# Rebuild the index of saved games at startup. Only files changed since the
+# last checkpoint are read (header-only), files already past the inactivity
+# threshold aren't opened, and half-written files are moved to quarantine/.
+GAME_INDEX_CHECKPOINT = os.path.join(GAME_STORAGE_DIR, 'index.checkpoint')
+game_index = recover_storage(GAME_STORAGE_DIR, GAME_INDEX_CHECKPOINT,
+                             prune_before=time.time() - INACTIVE_THRESHOLD)
+
+# Shared-memory table for active games. Set BATTLESHIP_GAME_TABLE to a path
+# (ideally on a tmpfs such as /dev/shm) so workers on the same host share
+# in-flight games without going through the game files. Finished games and
+# games the table can't hold are still written to GAME_STORAGE_DIR.
+GAME_TABLE_PATH = os.environ.get('BATTLESHIP_GAME_TABLE')
+GAME_TABLE_SLOTS = int(os.environ.get('BATTLESHIP_GAME_TABLE_SLOTS', 4096))
+game_table = SharedGameTable(GAME_TABLE_PATH, GAME_TABLE_SLOTS) if GAME_TABLE_PATH else None
+ACTIVE_STATUSES = ('waiting', 'playing')
+
+# Append-only archive of finished games, kept next to the game storage directory
+GAME_ARCHIVE_PATH = os.path.join(tempfile.gettempdir(), 'battleship_archive.tsv')
+
+# Rate limiting for the hot multiplayer endpoints. A single worker can keep
+# buckets in memory; set BATTLESHIP_RATE_LIMIT_FILE to share them between
+# workers on the same host.
+RATE_LIMIT_FILE = os.environ.get('BATTLESHIP_RATE_LIMIT_FILE')
+rate_limiter = RateLimiter(FileBackend(RATE_LIMIT_FILE) if RATE_LIMIT_FILE else MemoryBackend())
+
+def rate_limited(session_rate, session_capacity, game_rate, game_capacity):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            game_id = session.get('game_id')
+            player_number = session.get('player_number')
+
+            # One bucket per player session and one shared by the whole game. The
+            # session rule goes first so a spamming tab is stopped by its own
+            # bucket before it can drain the one its opponent relies on.
+            session_key = f"{game_id}:{player_number}" if game_id else request.remote_addr
+            rules = [(f"session:{session_key}", session_rate, session_capacity)]
+            if game_id:
+                rules.append((f"game:{game_id}", game_rate, game_capacity))
+
+            wait = rate_limiter.check(request.endpoint, rules)
+            if wait:
+                retry_after = retry_after_seconds(wait)
+                response = jsonify({
+                    'status': 'error',
+                    'message': 'Too many requests',
+                    'retry_after': retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Fields save_game puts at the start of each game file
+GAME_HEADER_KEYS = ('status', 'last_activity', 'created_at')
+
 # Functions for file-based game storage
 def save_game(game_id, game_data):
     try:
+        # Active games stay in the shared table; everything else goes to disk
+        if game_table and game_data.get('status') in ACTIVE_STATUSES:
+            if game_table.save(game_id, game_data):
+                logger.debug(f"Game saved to shared table: {game_id}")
+                return True
+
+        # Write the header fields first so startup recovery can read them
+        # without parsing the whole file, and write through a temp file so a
+        # crash never leaves a half-written game behind
+        header = {key: game_data[key] for key in GAME_HEADER_KEYS if key in game_data}
         file_path = os.path.join(GAME_STORAGE_DIR, f"{game_id}.json")
-        with open(file_path, 'w') as f:
-            json.dump(game_data, f)
+        # mkstemp gives every thread its own temp file, even for the same game
+        fd, temp_path = tempfile.mkstemp(dir=GAME_STORAGE_DIR, prefix=f"{game_id}.json.", suffix=TEMP_SUFFIX)
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({**header, **game_data}, f)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        # Only drop the table copy once the game is safely on disk
+        if game_table:
+            game_table.delete(game_id)
         logger.debug(f"Game saved: {game_id}")
         return True
     except Exception as e:
@@ -46,6 +130,12 @@ def save_game(game_id, game_data):
 
 def load_game(game_id):
     try:
+        if game_table and game_id:
+            game_data = game_table.load(game_id)
+            if game_data is not None:
+                logger.debug(f"Game loaded from shared table: {game_id}")
+                return game_data
+
         file_path = os.path.join(GAME_STORAGE_DIR, f"{game_id}.json")
         if os.path.exists(file_path):
             with open(file_path, 'r') as f:
@@ -61,6 +151,9 @@ def load_game(game_id):
 
 def delete_game(game_id):
     try:
+        if game_table and game_id:
+            game_table.delete(game_id)
+
         file_path = os.path.join(GAME_STORAGE_DIR, f"{game_id}.json")
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -76,36 +169,13 @@ def list_games():
         for filename in os.listdir(GAME_STORAGE_DIR):
             if filename.endswith('.json'):
                 games.append(filename[:-5])  # Remove .json extension
+        if game_table:
+            games.extend(gid for gid in game_table.game_ids() if gid not in games)
         return games
     except Exception as e:
         logger.error(f"Error listing games: {e}")
         return []
 
-def random_bot_ships():
-    ships = {}
-    occupied = set()
-
-    for ship, size in SHIP_SIZES.items():
-        placed = False
-        while not placed:
-            orientation = random.choice(['horizontal', 'vertical'])
-            row = random.randint(0, GRID_SIZE - 1)
-            col = random.randint(0, GRID_SIZE - 1)
-            coords = []
-
-            if orientation == 'horizontal' and col + size <= GRID_SIZE:
-                coords = [(row, c) for c in range(col, col + size)]
-            elif orientation == 'vertical' and row + size <= GRID_SIZE:
-                coords = [(r, col) for r in range(row, row + size)]
-
-            if coords and all((r, c) not in occupied for r, c in coords):
-                for coord in coords:
-                    occupied.add(coord)
-                ships[ship] = [{'row': r, 'col': c} for r, c in coords]
-                placed = True
-
-    return ships
-
 # Main menu - new home page
 @app.route('/')
 def home():
@@ -342,6 +412,7 @@ def multiplayer_submit_ships():
         if both_ready:
             game['status'] = 'playing'
             game['current_turn'] = 1  # Player 1 goes first
+            game['first_turn'] = game['current_turn']
             # Initialize game stats
             game['stats'] = {
                 '1': {'shots': 0, 'hits': 0, 'misses': 0},
@@ -430,6 +501,7 @@ def multiplayer_get_player_ships():
     return jsonify({'status': 'success', 'ships': game['player_ships'][player_number_str]})
 
 @app.route('/multiplayer/get_game_state')
+@rate_limited(session_rate=2, session_capacity=5, game_rate=4, game_capacity=10)
 def multiplayer_get_game_state():
     # Make session permanent to use the PERMANENT_SESSION_LIFETIME setting
     session.permanent = True
@@ -512,6 +584,7 @@ def multiplayer_get_game_state():
     return jsonify(response)
 
 @app.route('/multiplayer/make_shot', methods=['POST'])
+@rate_limited(session_rate=2, session_capacity=4, game_rate=2, game_capacity=6)
 def multiplayer_make_shot():
     try:
         # Make session permanent to use the PERMANENT_SESSION_LIFETIME setting
@@ -584,27 +657,17 @@ def multiplayer_make_shot():
             logger.error(f"Opponent ships not found: player_ships={bool('player_ships' in game)}, opponent={opponent_number_str in game.get('player_ships', {})}")
             return jsonify({'status': 'error', 'message': 'Opponent ships not found'})
 
-        # Check if the shot hits an opponent ship
-        hit = False
-        hit_ship_type = None
-
-        opponent_ships = game['player_ships'][opponent_number_str]
-
-        for ship_type, coords in opponent_ships.items():
-            for coord in coords:
-                if coord.get('row') == shot_row and coord.get('col') == shot_col:
-                    hit = True
-                    hit_ship_type = ship_type
-                    break
-            if hit:
-                break
-
         # Ensure 'hits' and 'misses' arrays exist
         if 'hits' not in game['shots'][player_number_str]:
             game['shots'][player_number_str]['hits'] = []
         if 'misses' not in game['shots'][player_number_str]:
             game['shots'][player_number_str]['misses'] = []
 
+        # Resolve the shot with the shared game rules
+        opponent_ships = ship_cells(game['player_ships'][opponent_number_str])
+        previous_hits = {(h.get('row'), h.get('col')) for h in game['shots'][player_number_str]['hits']}
+        hit, hit_ship_type, sunk, game_over = resolve_shot(opponent_ships, previous_hits, shot_row, shot_col)
+
         # Increment total shots count
         game['stats'][player_number_str]['shots'] = game['stats'][player_number_str].get('shots', 0) + 1
             
@@ -617,7 +680,7 @@ def multiplayer_make_shot():
             })
             # Increment hits count
             game['stats'][player_number_str]['hits'] = game['stats'][player_number_str].get('hits', 0) + 1
-            logger.debug(f"Hit! Ship type: {hit_ship_type}")
+            logger.debug(f"Hit! Ship type: {hit_ship_type}, sunk: {sunk}")
         else:
             game['shots'][player_number_str]['misses'].append({
                 'row': shot_row,
@@ -627,52 +690,11 @@ def multiplayer_make_shot():
             game['stats'][player_number_str]['misses'] = game['stats'][player_number_str].get('misses', 0) + 1
             logger.debug(f"Miss!")
 
-        # Check if ship is sunk
-        sunk = False
-        if hit:
-            ship_coords = game['player_ships'][opponent_number_str][hit_ship_type]
-            all_hit = True
-
-            for coord in ship_coords:
-                coord_hit = False
-                for hit_record in game['shots'][player_number_str]['hits']:
-                    if hit_record.get('row') == coord.get('row') and hit_record.get('col') == coord.get('col'):
-                        coord_hit = True
-                        break
-                if not coord_hit:
-                    all_hit = False
-                    break
-
-            sunk = all_hit
-            logger.debug(f"Ship sunk: {sunk}")
-
         # Check for game over (all ships sunk)
-        game_over = False
-        if hit:
-            all_ships_sunk = True
-
-            for ship_type, coords in game['player_ships'][opponent_number_str].items():
-                ship_sunk = True
-
-                for coord in coords:
-                    coord_hit = False
-                    for hit_record in game['shots'][player_number_str]['hits']:
-                        if hit_record.get('row') == coord.get('row') and hit_record.get('col') == coord.get('col'):
-                            coord_hit = True
-                            break
-                    if not coord_hit:
-                        ship_sunk = False
-                        break
-
-                if not ship_sunk:
-                    all_ships_sunk = False
-                    break
-
-            if all_ships_sunk:
-                game_over = True
-                game['status'] = 'game_over'
-                game['winner'] = int(player_number)
-                logger.debug(f"Game over! Player {player_number} wins!")
+        if game_over:
+            game['status'] = 'game_over'
+            game['winner'] = int(player_number)
+            logger.debug(f"Game over! Player {player_number} wins!")
 
         # Update turn if game not over
         if not game_over:
@@ -728,20 +750,76 @@ def debug_games():
             }
     return jsonify(debug_games)
 
+# Allowed and throttled request counters - for all workers when the limiter
+# backend is shared, otherwise for the worker (pid) that answers
+@app.route('/debug/rate_limits')
+def debug_rate_limits():
+    return jsonify(rate_limiter.counters())
+
+# Aggregated statistics over all archived games
+@app.route('/debug/archive_stats')
+def debug_archive_stats():
+    return jsonify(aggregate_archive(GAME_ARCHIVE_PATH))
+
+# Remove a game from storage and return it, or None if another worker got to
+# it first. Table games are claimed by whoever deletes them; game files are
+# claimed by renaming them out of the way, which only one worker can do.
+def claim_game(game_id):
+    try:
+        if game_table:
+            game = game_table.load(game_id)
+            if game is not None:
+                if not game_table.delete(game_id):
+                    return None
+                # Drop any older copy on disk as well
+                delete_game(game_id)
+                return game
+
+        file_path = os.path.join(GAME_STORAGE_DIR, f"{game_id}.json")
+        claim_path = f"{file_path}.claimed.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}"
+        try:
+            os.rename(file_path, claim_path)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(claim_path, 'r') as f:
+                return json.load(f)
+        finally:
+            os.remove(claim_path)
+    except Exception as e:
+        logger.error(f"Error claiming game {game_id}: {e}")
+        return None
+
 # Clean up inactive games - improved version
 def cleanup_inactive_games():
+    global game_index
     current_time = time.time()
-    # Increase inactive threshold to 60 minutes instead of 30
-    inactive_threshold = 60 * 60  # 60 minutes
+    inactive_threshold = INACTIVE_THRESHOLD
     
     # Keep track of number of games cleaned up
     cleaned_count = 0
 
-    for game_id in list_games():
+    # Refresh the index incrementally and only load games it says are stale.
+    # Games in the shared table aren't in the index, but loading them is cheap.
+    game_index = recover_storage(GAME_STORAGE_DIR, GAME_INDEX_CHECKPOINT,
+                                 prune_before=current_time - inactive_threshold)
+    candidates = [gid for gid, entry in game_index.items()
+                  if current_time - entry['last_activity'] > inactive_threshold]
+    if game_table:
+        candidates.extend(gid for gid in game_table.game_ids() if gid not in game_index)
+
+    for game_id in candidates:
         game = load_game(game_id)
         if game and (current_time - game['last_activity'] > inactive_threshold):
+            # Several workers may clean up at once - only the one that claims
+            # the game archives it, so the archive never gets duplicate lines
+            game = claim_game(game_id)
+            if not game:
+                continue
             logger.info(f"Cleaning up inactive game: {game_id}, last activity: {datetime.fromtimestamp(game['last_activity']).strftime('%Y-%m-%d %H:%M:%S')}")
-            delete_game(game_id)
+            # Keep the stats of finished games before the game goes away
+            if should_archive(game):
+                archive_game(GAME_ARCHIVE_PATH, game_id, game)
             cleaned_count += 1
             
     if cleaned_count > 0:
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Archive of completed games, one tab-separated line per game.
+# The column order below is the on-disk format - only ever append new
+# columns to the end so older lines stay readable.
+ARCHIVE_FIELDS = (
+    'game_id',
+    'status',
+    'winner',
+    'first_turn',
+    'created_at',
+    'ended_at',
+    'p1_shots', 'p1_hits', 'p1_misses',
+    'p2_shots', 'p2_hits', 'p2_misses',
+)
+
+# Statuses that count as "finished" for archiving purposes
+ARCHIVABLE_STATUSES = ('game_over', 'abandoned', 'playing')
+
+# Statuses that can appear in the archive - anything else is a damaged line
+ARCHIVED_STATUSES = ('game_over', 'abandoned')
+
+# Read the archive in fixed-size chunks so memory stays bounded
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Game length histogram bucket width, in total shots fired by both players
+LENGTH_BUCKET_SIZE = 10
+
+
+def should_archive(game):
+    # Only games that actually reached play have meaningful stats
+    return bool(game) and game.get('status') in ARCHIVABLE_STATUSES and 'stats' in game
+
+
+def encode_game(game_id, game):
+    stats = game.get('stats', {})
+    status = game.get('status')
+    # A game that went inactive mid-play was abandoned by its players
+    if status == 'playing':
+        status = 'abandoned'
+
+    values = [
+        game_id,
+        status,
+        game.get('winner') or 0,
+        game.get('first_turn') or 1,
+        int(game.get('created_at', 0)),
+        int(game.get('last_activity', 0)),
+    ]
+    for player in ['1', '2']:
+        player_stats = stats.get(player, {})
+        values.extend([
+            player_stats.get('shots', 0),
+            player_stats.get('hits', 0),
+            player_stats.get('misses', 0),
+        ])
+    return '\t'.join(str(value) for value in values) + '\n'
+
+
+def archive_game(archive_path, game_id, game):
+    try:
+        line = encode_game(game_id, game).encode('utf-8')
+        # O_APPEND keeps single-line writes from several workers from interleaving
+        fd = os.open(archive_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # A crash mid-append can leave a line without its newline. Finish it
+            # off first so it doesn't swallow this record; the reader then skips
+            # the fragment as a malformed line.
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                line = b'\n' + line
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        logger.debug(f"Game archived: {game_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error archiving game {game_id}: {e}")
+        return False
+
+
+def iter_archive_lines(archive_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    if not os.path.exists(archive_path):
+        return
+
+    with open(archive_path, 'rb') as f:
+        remainder = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (remainder + chunk).split(b'\n')
+            # The last piece may be a partial line; carry it into the next chunk
+            remainder = lines.pop()
+            for line in lines:
+                if line:
+                    yield line
+        # A trailing line without a newline is a half-written append - skip it
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.games = 0
+        self.skipped_lines = 0
+        self.status_counts = {}
+        self.shots = 0
+        self.hits = 0
+        self.misses = 0
+        self.length_histogram = {}
+        self.duration_total = 0
+        self.decided_games = 0
+        self.first_mover_wins = 0
+
+    def add_line(self, line):
+        fields = line.split(b'\t')
+        if len(fields) < len(ARCHIVE_FIELDS):
+            self.skipped_lines += 1
+            return
+
+        try:
+            status = fields[1].decode('ascii')
+            if status not in ARCHIVED_STATUSES:
+                raise ValueError(status)
+            winner = int(fields[2])
+            first_turn = int(fields[3])
+            created_at = int(fields[4])
+            ended_at = int(fields[5])
+            p1_shots, p1_hits, p1_misses, p2_shots, p2_hits, p2_misses = (
+                int(value) for value in fields[6:12]
+            )
+        except (ValueError, UnicodeDecodeError):
+            self.skipped_lines += 1
+            return
+
+        self.games += 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        self.shots += p1_shots + p2_shots
+        self.hits += p1_hits + p2_hits
+        self.misses += p1_misses + p2_misses
+
+        bucket = (p1_shots + p2_shots) // LENGTH_BUCKET_SIZE * LENGTH_BUCKET_SIZE
+        self.length_histogram[bucket] = self.length_histogram.get(bucket, 0) + 1
+        self.duration_total += max(0, ended_at - created_at)
+
+        if winner:
+            self.decided_games += 1
+            if winner == first_turn:
+                self.first_mover_wins += 1
+
+    def to_dict(self):
+        return {
+            'games': self.games,
+            'skipped_lines': self.skipped_lines,
+            'status_counts': self.status_counts,
+            'shots': self.shots,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / self.shots if self.shots else 0.0,
+            'length_histogram': {
+                f"{bucket}-{bucket + LENGTH_BUCKET_SIZE - 1}": count
+                for bucket, count in sorted(self.length_histogram.items())
+            },
+            'average_duration_seconds': self.duration_total / self.games if self.games else 0.0,
+            'decided_games': self.decided_games,
+            'first_mover_wins': self.first_mover_wins,
+            'first_mover_win_rate': (
+                self.first_mover_wins / self.decided_games if self.decided_games else 0.0
+            ),
+        }
+
+
+def aggregate_archive(archive_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    started = time.time()
+    stats = ArchiveStats()
+    try:
+        for line in iter_archive_lines(archive_path, chunk_size):
+            stats.add_line(line)
+    except Exception as e:
+        logger.error(f"Error aggregating archive {archive_path}: {e}")
+
+    result = stats.to_dict()
+    logger.debug(f"Aggregated {stats.games} archived games in {time.time() - started:.3f}s")
+    return result
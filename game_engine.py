@@ -0,0 +1,164 @@
+import random
+
+# Pure-Python game rules shared by the Flask routes and the headless simulator.
+# Ships are {ship_type: [(row, col), ...]} and hits are a set of (row, col)
+# cells, so the rules work the same on stored games and simulated ones.
+
+GRID_SIZE = 10
+SHIP_SIZES = {
+    'carrier': 5,
+    'battleship': 4,
+    'cruiser': 3,
+    'submarine': 3,
+    'destroyer': 2
+}
+
+
+def random_bot_ships(rng=random):
+    ships = {}
+    occupied = set()
+
+    for ship, size in SHIP_SIZES.items():
+        placed = False
+        while not placed:
+            orientation = rng.choice(['horizontal', 'vertical'])
+            row = rng.randint(0, GRID_SIZE - 1)
+            col = rng.randint(0, GRID_SIZE - 1)
+            coords = []
+
+            if orientation == 'horizontal' and col + size <= GRID_SIZE:
+                coords = [(row, c) for c in range(col, col + size)]
+            elif orientation == 'vertical' and row + size <= GRID_SIZE:
+                coords = [(r, col) for r in range(row, row + size)]
+
+            if coords and all((r, c) not in occupied for r, c in coords):
+                for coord in coords:
+                    occupied.add(coord)
+                ships[ship] = [{'row': r, 'col': c} for r, c in coords]
+                placed = True
+
+    return ships
+
+
+def ship_cells(ships):
+    return {
+        ship_type: [(coord.get('row'), coord.get('col')) for coord in coords]
+        for ship_type, coords in ships.items()
+    }
+
+
+def find_ship(ships, row, col):
+    for ship_type, cells in ships.items():
+        if (row, col) in cells:
+            return ship_type
+    return None
+
+
+def is_sunk(cells, hits):
+    return all(cell in hits for cell in cells)
+
+
+# Resolve a shot against a fleet. A hit is added to `hits`.
+# Returns (hit, ship_type, sunk, game_over).
+def resolve_shot(ships, hits, row, col):
+    ship_type = find_ship(ships, row, col)
+    if ship_type is None:
+        return False, None, False, False
+
+    hits.add((row, col))
+    sunk = is_sunk(ships[ship_type], hits)
+    game_over = sunk and all(is_sunk(cells, hits) for cells in ships.values())
+    return True, ship_type, sunk, game_over
+
+
+# Bots pick the next cell to fire at and are told the result of each shot
+class RandomBot:
+    def __init__(self, rng):
+        self.rng = rng
+        self.untried = [(r, c) for r in range(GRID_SIZE) for c in range(GRID_SIZE)]
+
+    def choose(self):
+        index = self.rng.randrange(len(self.untried))
+        # Swap-remove keeps picking O(1)
+        self.untried[index], self.untried[-1] = self.untried[-1], self.untried[index]
+        return self.untried.pop()
+
+    def discard(self, cell):
+        try:
+            self.untried.remove(cell)
+        except ValueError:
+            pass
+
+    def record(self, cell, hit, sunk):
+        pass
+
+
+# Same strategy as the single player bot in game.js: fire at random until a hit,
+# then work through the untried neighbours of every hit in order
+class HuntBot(RandomBot):
+    clear_on_sunk = False
+
+    def __init__(self, rng):
+        super().__init__(rng)
+        self.targets = []
+
+    def choose(self):
+        if self.targets:
+            cell = self.targets.pop(0)
+            self.discard(cell)
+            return cell
+        return super().choose()
+
+    def record(self, cell, hit, sunk):
+        if not hit:
+            return
+        if sunk and self.clear_on_sunk:
+            self.targets = []
+            return
+
+        row, col = cell
+        for target in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if target in self.untried and target not in self.targets:
+                self.targets.append(target)
+
+
+# HuntBot that drops its target queue as soon as a ship sinks - weaker when
+# ships touch, since neighbours of the next ship are forgotten too
+class ResetHuntBot(HuntBot):
+    clear_on_sunk = True
+
+
+BOTS = {
+    'random': RandomBot,
+    'hunt': HuntBot,
+    'hunt-reset': ResetHuntBot,
+}
+
+
+# Play one bot-vs-bot game and return its outcome, with stats in the same shape
+# as a multiplayer game's 'stats'
+def play_game(rng, bots=('hunt', 'hunt'), first_turn=1):
+    fleets = {player: random_bot_ships(rng) for player in ('1', '2')}
+    ships = {player: ship_cells(fleet) for player, fleet in fleets.items()}
+    hits = {'1': set(), '2': set()}
+    players = {'1': BOTS[bots[0]](rng), '2': BOTS[bots[1]](rng)}
+    stats = {player: {'shots': 0, 'hits': 0, 'misses': 0} for player in ('1', '2')}
+
+    current = str(first_turn)
+    while True:
+        opponent = '2' if current == '1' else '1'
+        cell = players[current].choose()
+        hit, ship_type, sunk, game_over = resolve_shot(ships[opponent], hits[current], *cell)
+        players[current].record(cell, hit, sunk)
+
+        stats[current]['shots'] += 1
+        stats[current]['hits' if hit else 'misses'] += 1
+
+        if game_over:
+            return {
+                'winner': int(current),
+                'first_turn': first_turn,
+                'stats': stats,
+                'fleets': fleets,
+            }
+        current = opponent
@@ -0,0 +1,450 @@
+import os
+import mmap
+import struct
+import fcntl
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Fixed-slot game table in a memory-mapped file, shared by every worker process
+# on the host. Each active game lives in one slot as a packed binary record, so
+# reading a game is a memory copy plus struct.unpack - no file I/O and no JSON.
+#
+# Readers are lock-free: every slot carries a sequence counter that writers make
+# odd while they update the slot and even again when they are done. A reader
+# retries whenever it sees an odd counter or the counter changed underneath it.
+# Writers serialise on a byte-range lock over their own slot, and slot
+# allocation serialises on a lock over the table header. Byte-range locks are
+# held per process, so threads within a worker also share a threading lock.
+#
+# The header carries a generation counter that is bumped whenever a game is
+# added to or removed from the table. Workers only rescan the slots for a game
+# they can't find when the generation has moved since their last scan.
+
+MAGIC = b'BSHPTBL2'
+HEADER = struct.Struct('<8sIiiQ')  # magic, slot count, free-list head, used slots, generation
+HEADER_SIZE = 64
+
+SLOT_SEQ = struct.Struct('<Q')
+SLOT_LINK = struct.Struct('<Bi')  # in use, next free slot
+SLOT_BODY = struct.Struct('<8sBBBBHdd6HBB17s17s200s200s')
+SLOT_SEQ_OFFSET = 0
+SLOT_LINK_OFFSET = SLOT_SEQ.size
+SLOT_BODY_OFFSET = SLOT_LINK_OFFSET + SLOT_LINK.size
+SLOT_SIZE = 512
+
+STATUSES = ('waiting', 'playing', 'game_over', 'abandoned')
+SHIP_ORDER = ('carrier', 'battleship', 'cruiser', 'submarine', 'destroyer')
+SHIP_LENGTHS = (5, 4, 3, 3, 2)
+SHIP_CELLS = sum(SHIP_LENGTHS)
+GRID_SIZE = 10
+PLAYERS = ('1', '2')
+STAT_FIELDS = ('shots', 'hits', 'misses')
+
+GAME_KEYS = {
+    'players', 'status', 'current_turn', 'first_turn', 'winner', 'player_ships',
+    'shots', 'stats', 'created_at', 'last_activity',
+}
+
+# Bits of the flags field
+FLAG_PLAYER_PRESENT = {'1': 1 << 0, '2': 1 << 1}
+FLAG_PLAYER_READY = {'1': 1 << 2, '2': 1 << 3}
+FLAG_SHIPS = {'1': 1 << 4, '2': 1 << 5}
+FLAG_STATS = 1 << 6
+FLAG_FIRST_TURN = 1 << 7
+FLAG_WINNER = 1 << 8
+
+READ_RETRIES = 100
+
+
+class NotEncodable(Exception):
+    pass
+
+
+def encode_cell(coord):
+    row = coord.get('row')
+    col = coord.get('col')
+    if not isinstance(row, int) or not isinstance(col, int):
+        raise NotEncodable('non-integer coordinate')
+    if not (0 <= row < GRID_SIZE and 0 <= col < GRID_SIZE):
+        raise NotEncodable('coordinate off the grid')
+    return row * GRID_SIZE + col
+
+
+def encode_ships(ships):
+    if set(ships) != set(SHIP_ORDER):
+        raise NotEncodable('unexpected fleet')
+    cells = bytearray()
+    for ship_type, length in zip(SHIP_ORDER, SHIP_LENGTHS):
+        coords = ships[ship_type]
+        if len(coords) != length:
+            raise NotEncodable(f'wrong length for {ship_type}')
+        cells.extend(encode_cell(coord) for coord in coords)
+    return bytes(cells)
+
+
+def decode_ships(cells):
+    ships = {}
+    index = 0
+    for ship_type, length in zip(SHIP_ORDER, SHIP_LENGTHS):
+        ships[ship_type] = [
+            {'row': cell // GRID_SIZE, 'col': cell % GRID_SIZE}
+            for cell in cells[index:index + length]
+        ]
+        index += length
+    return ships
+
+
+# Shots are stored as one little-endian uint16 each: the cell in the low byte and
+# the index of the ship that was hit (plus one, zero for a miss) in the high byte.
+# Hits and misses are kept in separate lists in the game dict, so the hits are
+# written first and the misses after them.
+def encode_shots(shots):
+    if set(shots) != {'hits', 'misses'}:
+        raise NotEncodable('unexpected shot lists')
+    values = []
+    for hit in shots['hits']:
+        if set(hit) != {'row', 'col', 'ship_type'} or hit['ship_type'] not in SHIP_ORDER:
+            raise NotEncodable('unexpected hit record')
+        values.append(encode_cell(hit) | (SHIP_ORDER.index(hit['ship_type']) + 1) << 8)
+    for miss in shots['misses']:
+        if set(miss) != {'row', 'col'}:
+            raise NotEncodable('unexpected miss record')
+        values.append(encode_cell(miss))
+    if len(values) > GRID_SIZE * GRID_SIZE:
+        raise NotEncodable('too many shots')
+    return len(values), struct.pack(f'<{len(values)}H', *values)
+
+
+def decode_shots(count, data):
+    hits = []
+    misses = []
+    for value in struct.unpack_from(f'<{count}H', data):
+        cell = value & 0xFF
+        ship = value >> 8
+        if ship:
+            hits.append({'row': cell // GRID_SIZE, 'col': cell % GRID_SIZE,
+                         'ship_type': SHIP_ORDER[ship - 1]})
+        else:
+            misses.append({'row': cell // GRID_SIZE, 'col': cell % GRID_SIZE})
+    return {'hits': hits, 'misses': misses}
+
+
+def encode_game(game_id, game):
+    try:
+        encoded_id = game_id.encode('ascii')
+    except UnicodeEncodeError:
+        raise NotEncodable('non-ascii game id')
+    if not encoded_id or len(encoded_id) > 8:
+        raise NotEncodable('game id too long')
+    if not set(game) <= GAME_KEYS:
+        raise NotEncodable('unexpected game keys')
+    if game.get('status') not in STATUSES:
+        raise NotEncodable('unexpected status')
+
+    flags = 0
+
+    players = game.get('players', {})
+    if not set(players) <= set(PLAYERS):
+        raise NotEncodable('unexpected players')
+    for player, info in players.items():
+        if not set(info) <= {'ready'}:
+            raise NotEncodable('unexpected player info')
+        flags |= FLAG_PLAYER_PRESENT[player]
+        if info.get('ready'):
+            flags |= FLAG_PLAYER_READY[player]
+
+    ships = {player: b'\0' * SHIP_CELLS for player in PLAYERS}
+    player_ships = game.get('player_ships', {})
+    if not set(player_ships) <= set(PLAYERS):
+        raise NotEncodable('unexpected player ships')
+    for player, fleet in player_ships.items():
+        ships[player] = encode_ships(fleet)
+        flags |= FLAG_SHIPS[player]
+
+    shots = game.get('shots', {})
+    if set(shots) != set(PLAYERS):
+        raise NotEncodable('unexpected shots')
+    shot_counts = {}
+    shot_data = {}
+    for player in PLAYERS:
+        shot_counts[player], shot_data[player] = encode_shots(shots[player])
+
+    stat_values = [0] * 6
+    if 'stats' in game:
+        flags |= FLAG_STATS
+        if set(game['stats']) != set(PLAYERS):
+            raise NotEncodable('unexpected stats')
+        for i, player in enumerate(PLAYERS):
+            if set(game['stats'][player]) != set(STAT_FIELDS):
+                raise NotEncodable('unexpected stats')
+            for j, field in enumerate(STAT_FIELDS):
+                stat_values[i * 3 + j] = game['stats'][player][field]
+
+    if 'first_turn' in game:
+        flags |= FLAG_FIRST_TURN
+    if 'winner' in game:
+        flags |= FLAG_WINNER
+
+    try:
+        return SLOT_BODY.pack(
+            encoded_id,
+            STATUSES.index(game['status']),
+            game.get('current_turn') or 0,
+            game.get('first_turn') or 0,
+            game.get('winner') or 0,
+            flags,
+            float(game.get('created_at', 0)),
+            float(game.get('last_activity', 0)),
+            *stat_values,
+            shot_counts['1'],
+            shot_counts['2'],
+            ships['1'],
+            ships['2'],
+            shot_data['1'],
+            shot_data['2'],
+        )
+    except (struct.error, TypeError, ValueError) as e:
+        raise NotEncodable(str(e))
+
+
+def decode_game(body):
+    (encoded_id, status, current_turn, first_turn, winner, flags, created_at, last_activity,
+     s1, h1, m1, s2, h2, m2, count1, count2, ships1, ships2, shots1, shots2) = SLOT_BODY.unpack(body)
+
+    game = {
+        'players': {
+            player: {'ready': bool(flags & FLAG_PLAYER_READY[player])}
+            for player in PLAYERS if flags & FLAG_PLAYER_PRESENT[player]
+        },
+        'status': STATUSES[status],
+        'current_turn': current_turn or None,
+        'player_ships': {},
+        'shots': {'1': decode_shots(count1, shots1), '2': decode_shots(count2, shots2)},
+        'created_at': created_at,
+        'last_activity': last_activity,
+    }
+    for player, cells in (('1', ships1), ('2', ships2)):
+        if flags & FLAG_SHIPS[player]:
+            game['player_ships'][player] = decode_ships(cells)
+    if flags & FLAG_STATS:
+        game['stats'] = {
+            '1': {'shots': s1, 'hits': h1, 'misses': m1},
+            '2': {'shots': s2, 'hits': h2, 'misses': m2},
+        }
+    if flags & FLAG_FIRST_TURN:
+        game['first_turn'] = first_turn
+    if flags & FLAG_WINNER:
+        game['winner'] = winner or None
+    return encoded_id.rstrip(b'\0').decode('ascii'), game
+
+
+class SharedGameTable:
+    def __init__(self, path, slots=4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.slot_index = {}
+        self.index_generation = None
+        # Re-entrant because a new game's slot is written under the header lock
+        self.thread_lock = threading.RLock()
+
+        # The first worker to get the header lock lays out the table
+        self.lock(0, HEADER_SIZE)
+        try:
+            size = os.fstat(self.fd).st_size
+            if size >= HEADER_SIZE and os.pread(self.fd, len(MAGIC), 0) == MAGIC:
+                slots = HEADER.unpack(os.pread(self.fd, HEADER.size, 0))[1]
+                self.mm = mmap.mmap(self.fd, HEADER_SIZE + slots * SLOT_SIZE)
+            else:
+                os.ftruncate(self.fd, HEADER_SIZE + slots * SLOT_SIZE)
+                self.mm = mmap.mmap(self.fd, HEADER_SIZE + slots * SLOT_SIZE)
+                for slot in range(slots):
+                    next_free = slot + 1 if slot + 1 < slots else -1
+                    SLOT_LINK.pack_into(self.mm, self.slot_offset(slot) + SLOT_LINK_OFFSET, 0, next_free)
+                HEADER.pack_into(self.mm, 0, MAGIC, slots, 0, 0, 0)
+                logger.debug(f"Initialised shared game table {path} with {slots} slots")
+        finally:
+            self.unlock(0, HEADER_SIZE)
+        self.slots = slots
+
+    def lock(self, offset, length):
+        self.thread_lock.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, offset)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+
+    def unlock(self, offset, length):
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, length, offset)
+        finally:
+            self.thread_lock.release()
+
+    def generation(self):
+        return HEADER.unpack_from(self.mm, 0)[4]
+
+    def slot_offset(self, slot):
+        return HEADER_SIZE + slot * SLOT_SIZE
+
+    def slot_game_id(self, slot):
+        offset = self.slot_offset(slot)
+        if not self.mm[offset + SLOT_LINK_OFFSET]:
+            return None
+        encoded_id = self.mm[offset + SLOT_BODY_OFFSET:offset + SLOT_BODY_OFFSET + 8]
+        return encoded_id.rstrip(b'\0').decode('ascii', 'replace')
+
+    def find_slot(self, game_id):
+        slot = self.slot_index.get(game_id)
+        if slot is not None and self.slot_game_id(slot) == game_id:
+            return slot
+
+        # Nothing was added or removed since our last scan, so the game isn't here
+        generation = self.generation()
+        if generation == self.index_generation:
+            return None
+
+        # Another worker may have placed or moved the game - rebuild our index
+        slot_index = {}
+        for slot in range(self.slots):
+            slot_game_id = self.slot_game_id(slot)
+            if slot_game_id is not None:
+                slot_index[slot_game_id] = slot
+        self.slot_index = slot_index
+        self.index_generation = generation
+        return slot_index.get(game_id)
+
+    def read_slot(self, slot):
+        offset = self.slot_offset(slot)
+        seq_offset = offset + SLOT_SEQ_OFFSET
+        body_offset = offset + SLOT_BODY_OFFSET
+        for _ in range(READ_RETRIES):
+            before = SLOT_SEQ.unpack_from(self.mm, seq_offset)[0]
+            if before & 1:
+                continue
+            in_use = self.mm[offset + SLOT_LINK_OFFSET]
+            body = self.mm[body_offset:body_offset + SLOT_BODY.size]
+            if SLOT_SEQ.unpack_from(self.mm, seq_offset)[0] == before:
+                return body if in_use else None
+
+        # A writer kept the slot busy; take its lock to get a stable copy
+        self.lock(offset, SLOT_SIZE)
+        try:
+            if not self.mm[offset + SLOT_LINK_OFFSET]:
+                return None
+            return self.mm[body_offset:body_offset + SLOT_BODY.size]
+        finally:
+            self.unlock(offset, SLOT_SIZE)
+
+    # Write a game into its slot, or clear the slot when body is None. A freshly
+    # allocated slot is written with claim=True; otherwise the slot must still
+    # belong to this game, so a slot freed or reused by another worker in the
+    # meantime is left alone.
+    def write_slot(self, slot, game_id, body=None, claim=False):
+        offset = self.slot_offset(slot)
+        seq_offset = offset + SLOT_SEQ_OFFSET
+        self.lock(offset, SLOT_SIZE)
+        try:
+            current = self.slot_game_id(slot)
+            if current != (None if claim else game_id):
+                return False
+
+            seq = SLOT_SEQ.unpack_from(self.mm, seq_offset)[0]
+            SLOT_SEQ.pack_into(self.mm, seq_offset, seq + 1)
+            if body is None:
+                self.mm[offset + SLOT_LINK_OFFSET] = 0
+            else:
+                self.mm[offset + SLOT_BODY_OFFSET:offset + SLOT_BODY_OFFSET + SLOT_BODY.size] = body
+                self.mm[offset + SLOT_LINK_OFFSET] = 1
+            SLOT_SEQ.pack_into(self.mm, seq_offset, seq + 2)
+            return True
+        finally:
+            self.unlock(offset, SLOT_SIZE)
+
+    # Pop a slot off the free-list. The caller must hold the header lock.
+    def pop_free_slot(self):
+        magic, slots, free_head, used, generation = HEADER.unpack_from(self.mm, 0)
+        if free_head < 0:
+            return None
+        next_free = SLOT_LINK.unpack_from(self.mm, self.slot_offset(free_head) + SLOT_LINK_OFFSET)[1]
+        HEADER.pack_into(self.mm, 0, magic, slots, next_free, used + 1, generation)
+        return free_head
+
+    def release_slot(self, slot):
+        self.lock(0, HEADER_SIZE)
+        try:
+            magic, slots, free_head, used, generation = HEADER.unpack_from(self.mm, 0)
+            link_offset = self.slot_offset(slot) + SLOT_LINK_OFFSET
+            SLOT_LINK.pack_into(self.mm, link_offset, 0, free_head)
+            HEADER.pack_into(self.mm, 0, magic, slots, slot, used - 1, generation + 1)
+        finally:
+            self.unlock(0, HEADER_SIZE)
+
+    def load(self, game_id):
+        slot = self.find_slot(game_id)
+        if slot is None:
+            return None
+        body = self.read_slot(slot)
+        if body is None:
+            return None
+        slot_game_id, game = decode_game(body)
+        return game if slot_game_id == game_id else None
+
+    # Returns False when the game can't be kept in the table (unusual shape or
+    # no free slots) so the caller can fall back to durable storage
+    def save(self, game_id, game):
+        try:
+            body = encode_game(game_id, game)
+        except NotEncodable as e:
+            logger.debug(f"Game {game_id} not kept in shared table: {e}")
+            return False
+
+        slot = self.find_slot(game_id)
+        if slot is not None and self.write_slot(slot, game_id, body):
+            return True
+
+        # Adding a game is done entirely under the header lock: look again in
+        # case another worker added it since our lookup, then claim a slot,
+        # write it and bump the generation. Every game is published this way,
+        # so a lookup made under the lock can't miss a half-added game and a
+        # game never ends up in two slots.
+        self.lock(0, HEADER_SIZE)
+        try:
+            slot = self.find_slot(game_id)
+            if slot is not None:
+                return self.write_slot(slot, game_id, body)
+
+            slot = self.pop_free_slot()
+            if slot is None:
+                logger.warning(f"Shared game table is full, game {game_id} goes to disk")
+                return False
+            if not self.write_slot(slot, game_id, body, claim=True):
+                logger.error(f"Shared game table slot {slot} was handed out twice")
+                return False
+
+            magic, slots, free_head, used, generation = HEADER.unpack_from(self.mm, 0)
+            HEADER.pack_into(self.mm, 0, magic, slots, free_head, used, generation + 1)
+            self.slot_index[game_id] = slot
+            return True
+        finally:
+            self.unlock(0, HEADER_SIZE)
+
+    # Returns True only for the caller that actually removed the game, so
+    # several workers racing to delete it can tell who won
+    def delete(self, game_id):
+        slot = self.find_slot(game_id)
+        if slot is None:
+            return False
+        if not self.write_slot(slot, game_id, None):
+            return False
+        self.release_slot(slot)
+        self.slot_index.pop(game_id, None)
+        return True
+
+    def game_ids(self):
+        return [
+            game_id for game_id in
+            (self.slot_game_id(slot) for slot in range(self.slots))
+            if game_id is not None
+        ]
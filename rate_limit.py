@@ -0,0 +1,204 @@
+import os
+import math
+import time
+import struct
+import fcntl
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Token bucket state is (tokens, last_refill_time). Backends only store that
+# pair; the refill arithmetic lives in take_token so every backend behaves
+# the same way.
+def take_token(state, rate, capacity, now):
+    if state is None:
+        tokens, updated = float(capacity), now
+    else:
+        tokens, updated = state
+        tokens = min(float(capacity), tokens + (now - updated) * rate)
+
+    if tokens >= 1.0:
+        return (tokens - 1.0, now), 0.0
+
+    # Not enough tokens - report how long until the next one is available
+    return (tokens, now), (1.0 - tokens) / rate
+
+
+# Per-process backend - enough for a single worker (e.g. the dev server)
+class MemoryBackend:
+    shared = False
+
+    def __init__(self, max_keys=10000, idle_seconds=300):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.allowed = {}
+        self.throttled = {}
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+
+    def take(self, key, rate, capacity, now):
+        with self.lock:
+            if key not in self.buckets and len(self.buckets) >= self.max_keys:
+                # Forget buckets that have not been touched for a while
+                self.buckets = {
+                    k: v for k, v in self.buckets.items()
+                    if now - v[1] < self.idle_seconds
+                }
+            state, wait = take_token(self.buckets.get(key), rate, capacity, now)
+            self.buckets[key] = state
+            return wait
+
+    def count(self, endpoint, throttled):
+        counters = self.throttled if throttled else self.allowed
+        with self.lock:
+            counters[endpoint] = counters.get(endpoint, 0) + 1
+
+    def counters(self):
+        with self.lock:
+            return {'allowed': dict(self.allowed), 'throttled': dict(self.throttled)}
+
+
+# Shared backend for several worker processes on one host. Buckets live in
+# fixed 24-byte slots of a single file, tagged with a fingerprint of their key.
+# A key may sit in any of PROBE_SLOTS consecutive slots starting at its hashed
+# home slot; when all of them belong to other keys, the least recently used one
+# is taken over. The probe window is locked with a byte range lock, so workers
+# only contend when their windows overlap. Byte range locks are per process, so
+# threads within a worker also share a threading lock.
+#
+# The allowed/throttled counters live after the bucket slots in the same file,
+# one fixed slot per endpoint, so every worker reports the same totals.
+class FileBackend:
+    SLOT_FORMAT = '<Qdd'  # key fingerprint, tokens, last refill time
+    SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+    PROBE_SLOTS = 8
+    COUNTER_FORMAT = '<48sQQ'  # endpoint name, allowed, throttled
+    COUNTER_SIZE = struct.calcsize(COUNTER_FORMAT)
+    COUNTER_SLOTS = 64
+    shared = True
+
+    def __init__(self, path, slots=4096):
+        self.path = path
+        self.slots = max(slots, self.PROBE_SLOTS)
+        self.thread_lock = threading.Lock()
+        self.counter_offset = self.slots * self.SLOT_SIZE
+        self.counter_region = self.COUNTER_SLOTS * self.COUNTER_SIZE
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size < self.counter_offset + self.counter_region:
+            os.ftruncate(self.fd, self.counter_offset + self.counter_region)
+
+    def locate(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        home = int.from_bytes(digest[:8], 'little') % (self.slots - self.PROBE_SLOTS + 1)
+        # Zero marks an empty slot, so never hand it out as a fingerprint
+        fingerprint = int.from_bytes(digest[8:], 'little') | 1
+        return home * self.SLOT_SIZE, fingerprint
+
+    def take(self, key, rate, capacity, now):
+        window_offset, fingerprint = self.locate(key)
+        window_size = self.PROBE_SLOTS * self.SLOT_SIZE
+        with self.thread_lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, window_size, window_offset)
+            try:
+                window = os.pread(self.fd, window_size, window_offset)
+                slots = [struct.unpack_from(self.SLOT_FORMAT, window, i * self.SLOT_SIZE)
+                         for i in range(self.PROBE_SLOTS)]
+
+                state = None
+                index = next((i for i, slot in enumerate(slots) if slot[0] == fingerprint), None)
+                if index is not None:
+                    state = slots[index][1:]
+                else:
+                    index = next((i for i, slot in enumerate(slots) if slot[0] == 0), None)
+                    if index is None:
+                        index = min(range(self.PROBE_SLOTS), key=lambda i: slots[i][2])
+
+                state, wait = take_token(state, rate, capacity, now)
+                os.pwrite(self.fd, struct.pack(self.SLOT_FORMAT, fingerprint, *state),
+                          window_offset + index * self.SLOT_SIZE)
+                return wait
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, window_size, window_offset)
+
+    def read_counters(self):
+        region = os.pread(self.fd, self.counter_region, self.counter_offset)
+        return [struct.unpack_from(self.COUNTER_FORMAT, region, i * self.COUNTER_SIZE)
+                for i in range(self.COUNTER_SLOTS)]
+
+    def count(self, endpoint, throttled):
+        name = endpoint.encode('utf-8')[:48]
+        with self.thread_lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.counter_region, self.counter_offset)
+            try:
+                counters = self.read_counters()
+                index = next((i for i, c in enumerate(counters) if c[0].rstrip(b'\0') == name), None)
+                if index is None:
+                    index = next((i for i, c in enumerate(counters) if not c[0].strip(b'\0')), None)
+                if index is None:
+                    logger.warning(f"No counter slot left for {endpoint}")
+                    return
+                _, allowed, throttled_count = counters[index]
+                if throttled:
+                    throttled_count += 1
+                else:
+                    allowed += 1
+                os.pwrite(self.fd, struct.pack(self.COUNTER_FORMAT, name, allowed, throttled_count),
+                          self.counter_offset + index * self.COUNTER_SIZE)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.counter_region, self.counter_offset)
+
+    def counters(self):
+        result = {'allowed': {}, 'throttled': {}}
+        for name, allowed, throttled in self.read_counters():
+            name = name.rstrip(b'\0').decode('utf-8', 'replace')
+            if name:
+                result['allowed'][name] = allowed
+                result['throttled'][name] = throttled
+        return result
+
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+
+    # Check the (key, rate, capacity) rules in order and return how long to
+    # wait, or 0 if the request may go ahead. Checking stops at the first rule
+    # that rejects, so a client over its own (first) limit doesn't keep
+    # draining the buckets it shares with others.
+    def check(self, endpoint, rules):
+        now = time.time()
+        wait = 0.0
+        for key, rate, capacity in rules:
+            try:
+                wait = self.backend.take(f"{endpoint}:{key}", rate, capacity, now)
+            except Exception as e:
+                # Never block gameplay because the limiter backend failed
+                logger.error(f"Rate limiter backend error for {endpoint}: {e}")
+                continue
+            if wait:
+                break
+
+        try:
+            self.backend.count(endpoint, bool(wait))
+        except Exception as e:
+            logger.error(f"Rate limiter counter error for {endpoint}: {e}")
+
+        if wait:
+            logger.debug(f"Throttled {endpoint}, retry after {wait:.2f}s")
+        return wait
+
+    # Counters are totals for all workers with a shared backend, otherwise
+    # only for the worker (pid) that answers
+    def counters(self):
+        counters = self.backend.counters()
+        counters['pid'] = os.getpid()
+        counters['scope'] = 'all workers' if self.backend.shared else 'this worker'
+        return counters
+
+
+def retry_after_seconds(wait):
+    # Retry-After only takes whole seconds
+    return max(1, int(math.ceil(wait)))
@@ -0,0 +1,146 @@
+import sys
+import time
+import random
+import argparse
+import multiprocessing
+
+from game_engine import BOTS, GRID_SIZE, play_game
+
+# Headless bot-vs-bot simulator, e.g.
+#   python simulate.py --games 1000000 --bots hunt hunt-reset --first-turn alternate
+# Games are split into shards run on a process pool. Every game is seeded from
+# (seed, game index), so results don't depend on the number of workers.
+
+LENGTH_BUCKET_SIZE = 10
+
+
+def new_totals():
+    return {
+        'games': 0,
+        'wins': {1: 0, 2: 0},
+        'first_mover_wins': 0,
+        'shots': {1: 0, 2: 0},
+        'hits': {1: 0, 2: 0},
+        'length_histogram': {},
+        'ship_cells': [0] * (GRID_SIZE * GRID_SIZE),
+    }
+
+
+def merge_totals(totals, shard):
+    totals['games'] += shard['games']
+    totals['first_mover_wins'] += shard['first_mover_wins']
+    for player in (1, 2):
+        totals['wins'][player] += shard['wins'][player]
+        totals['shots'][player] += shard['shots'][player]
+        totals['hits'][player] += shard['hits'][player]
+    for bucket, count in shard['length_histogram'].items():
+        totals['length_histogram'][bucket] = totals['length_histogram'].get(bucket, 0) + count
+    for cell, count in enumerate(shard['ship_cells']):
+        totals['ship_cells'][cell] += count
+
+
+def first_turn_for(index, first_turn):
+    if first_turn == 'alternate':
+        return 1 if index % 2 == 0 else 2
+    return int(first_turn)
+
+
+def run_shard(task):
+    start, end, seed, bots, first_turn = task
+    totals = new_totals()
+
+    for index in range(start, end):
+        rng = random.Random(f"{seed}:{index}")
+        result = play_game(rng, bots, first_turn_for(index, first_turn))
+
+        totals['games'] += 1
+        totals['wins'][result['winner']] += 1
+        if result['winner'] == result['first_turn']:
+            totals['first_mover_wins'] += 1
+
+        length = 0
+        for player in (1, 2):
+            stats = result['stats'][str(player)]
+            totals['shots'][player] += stats['shots']
+            totals['hits'][player] += stats['hits']
+            length += stats['shots']
+        bucket = length // LENGTH_BUCKET_SIZE * LENGTH_BUCKET_SIZE
+        totals['length_histogram'][bucket] = totals['length_histogram'].get(bucket, 0) + 1
+
+        # Where random_bot_ships puts ships, to check placement fairness
+        for fleet in result['fleets'].values():
+            for coords in fleet.values():
+                for coord in coords:
+                    totals['ship_cells'][coord['row'] * GRID_SIZE + coord['col']] += 1
+
+    return totals
+
+
+def make_shards(games, shard_size, seed, bots, first_turn):
+    return [
+        (start, min(start + shard_size, games), seed, bots, first_turn)
+        for start in range(0, games, shard_size)
+    ]
+
+
+def report(totals, bots, elapsed):
+    games = totals['games']
+    print(f"Played {games} games in {elapsed:.2f}s ({games / elapsed if elapsed else 0:.0f} games/s)")
+    for player in (1, 2):
+        shots = totals['shots'][player]
+        print(f"Player {player} ({bots[player - 1]}): "
+              f"win rate {totals['wins'][player] / games:.4f}, "
+              f"hit rate {totals['hits'][player] / shots if shots else 0:.4f}")
+    print(f"First mover win rate: {totals['first_mover_wins'] / games:.4f}")
+    print(f"Average game length: {(totals['shots'][1] + totals['shots'][2]) / games:.1f} shots")
+
+    print("Game length distribution (total shots):")
+    for bucket, count in sorted(totals['length_histogram'].items()):
+        print(f"  {bucket:3d}-{bucket + LENGTH_BUCKET_SIZE - 1:3d}: {count / games:.4f}")
+
+    # Each game places two fleets
+    occupancy = [count / (2 * games) for count in totals['ship_cells']]
+    print(f"Ship cell occupancy: min {min(occupancy):.4f}, max {max(occupancy):.4f}")
+    for row in range(GRID_SIZE):
+        print('  ' + ' '.join(f"{occupancy[row * GRID_SIZE + col]:.2f}" for col in range(GRID_SIZE)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run headless bot-vs-bot Battleship games.')
+    parser.add_argument('--games', type=int, default=10000, help='number of games to play')
+    parser.add_argument('--bots', nargs=2, choices=sorted(BOTS), default=['hunt', 'hunt'],
+                        metavar=('PLAYER1', 'PLAYER2'),
+                        help=f"bot for each player ({', '.join(sorted(BOTS))})")
+    parser.add_argument('--first-turn', choices=['1', '2', 'alternate'], default='1',
+                        help='which player moves first')
+    parser.add_argument('--seed', type=int, default=0, help='base seed for the games')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--shard-size', type=int, default=1000, help='games per pool task')
+    args = parser.parse_args(argv)
+
+    if args.games <= 0:
+        parser.error('--games must be positive')
+    if args.shard_size <= 0:
+        parser.error('--shard-size must be positive')
+
+    bots = tuple(args.bots)
+    shards = make_shards(args.games, args.shard_size, args.seed, bots, args.first_turn)
+    totals = new_totals()
+
+    started = time.time()
+    if args.workers <= 1:
+        for shard in shards:
+            merge_totals(totals, run_shard(shard))
+    else:
+        with multiprocessing.Pool(args.workers) as pool:
+            for shard_totals in pool.imap_unordered(run_shard, shards):
+                merge_totals(totals, shard_totals)
+    elapsed = time.time() - started
+
+    report(totals, bots, elapsed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
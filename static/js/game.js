@@ -532,6 +532,27 @@ function startPolling() {
     gameState.pollingInterval = setInterval(pollGameState, 2000);
 }
 
+// Read the server's Retry-After header (in seconds) as milliseconds
+function getRetryAfterMs(response) {
+    const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+    return (isNaN(retryAfter) ? 2 : Math.max(1, retryAfter)) * 1000;
+}
+
+// Stop polling and resume once the server says we may try again
+function pausePolling(delay) {
+    if (gameState.pollingInterval) {
+        clearInterval(gameState.pollingInterval);
+        gameState.pollingInterval = null;
+    }
+
+    setTimeout(() => {
+        if (!gameState.gameOver && !gameState.pollingInterval) {
+            pollGameState();
+            gameState.pollingInterval = setInterval(pollGameState, 2000);
+        }
+    }, delay);
+}
+
 // Poll for game state updates with reconnection logic
 function pollGameState() {
     // Show connecting status
@@ -539,12 +560,22 @@ function pollGameState() {
 
     fetch('/multiplayer/get_game_state')
         .then(response => {
+            // Server is throttling us - back off for as long as it asks
+            if (response.status === 429) {
+                updateConnectionStatus('connected');
+                pausePolling(getRetryAfterMs(response));
+                return null;
+            }
             if (!response.ok) {
                 throw new Error(`HTTP error! Status: ${response.status}`);
             }
             return response.json();
         })
         .then(data => {
+            if (!data) {
+                return;
+            }
+
             // Update connection status
             updateConnectionStatus('connected');
 
@@ -847,6 +878,14 @@ function handleMultiplayerShot(row, col, cell) {
         body: JSON.stringify({ row: row, col: col })
     })
     .then(response => {
+        // Throttled - let the player retry once the server allows it
+        if (response.status === 429) {
+            const delay = getRetryAfterMs(response);
+            return response.json().then(data => {
+                data.message = `Too many shots, please wait ${delay / 1000} seconds`;
+                return data;
+            });
+        }
         if (!response.ok) {
             throw new Error(`HTTP error! Status: ${response.status}`);
         }
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Rebuilds the index of saved games from the storage directory without loading
+# every game. A checkpoint file remembers (mtime, size, status, last_activity)
+# for each game file, so on the next start only files that changed since the
+# checkpoint are opened at all, and those are parsed header-only.
+
+CHECKPOINT_VERSION = 1
+QUARANTINE_DIR_NAME = 'quarantine'
+TEMP_SUFFIX = '.tmp'
+
+# Temp files older than this were left behind by an interrupted write
+STALE_TEMP_SECONDS = 60
+
+# save_game writes the header fields first, so they are always in this prefix
+HEADER_BYTES = 4096
+TAIL_BYTES = 64
+
+STATUS_PATTERN = re.compile(rb'"status":\s*"(\w+)"')
+LAST_ACTIVITY_PATTERN = re.compile(rb'"last_activity":\s*(-?[0-9.eE+-]+)')
+
+
+def load_checkpoint(checkpoint_path):
+    try:
+        with open(checkpoint_path, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('version') != CHECKPOINT_VERSION:
+            return {}
+        return checkpoint.get('entries', {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable index checkpoint {checkpoint_path}: {e}")
+        return {}
+
+
+def save_checkpoint(checkpoint_path, entries):
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(checkpoint_path),
+                                         prefix=f"{os.path.basename(checkpoint_path)}.",
+                                         suffix=TEMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': CHECKPOINT_VERSION, 'entries': entries}, f)
+            os.replace(temp_path, checkpoint_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return True
+    except Exception as e:
+        logger.error(f"Error saving index checkpoint {checkpoint_path}: {e}")
+        return False
+
+
+# Returns (status, last_activity) or None if the file is truncated or corrupt
+def parse_header(path, size):
+    with open(path, 'rb') as f:
+        head = f.read(HEADER_BYTES)
+        if size > HEADER_BYTES:
+            f.seek(-TAIL_BYTES, os.SEEK_END)
+            tail = f.read()
+        else:
+            tail = head
+
+    # A complete game file is a single JSON object
+    if not head.lstrip().startswith(b'{') or not tail.rstrip().endswith(b'}'):
+        return None
+
+    status = STATUS_PATTERN.search(head)
+    last_activity = LAST_ACTIVITY_PATTERN.search(head)
+    if status and last_activity:
+        try:
+            return status.group(1).decode('ascii'), float(last_activity.group(1))
+        except ValueError:
+            pass
+
+    # Files written before the header-first layout need a full parse
+    try:
+        with open(path, 'r') as f:
+            game = json.load(f)
+        return game.get('status'), float(game.get('last_activity', 0))
+    except (ValueError, TypeError):
+        return None
+
+
+def quarantine_file(storage_dir, filename):
+    try:
+        quarantine_dir = os.path.join(storage_dir, QUARANTINE_DIR_NAME)
+        os.makedirs(quarantine_dir, exist_ok=True)
+        # Suffix the name so a later damaged file with the same name (e.g. a
+        # game id that was reused) doesn't overwrite the earlier one
+        target = f"{filename}.{time.time_ns()}.{os.getpid()}"
+        os.replace(os.path.join(storage_dir, filename), os.path.join(quarantine_dir, target))
+        logger.warning(f"Quarantined damaged game file: {filename} -> {target}")
+        return True
+    except FileNotFoundError:
+        # Another worker got to it first
+        return False
+    except Exception as e:
+        logger.error(f"Error quarantining {filename}: {e}")
+        return False
+
+
+# Scan the storage directory and return {game_id: entry} where entry holds
+# mtime_ns, size, status and last_activity. Files last modified before
+# prune_before are not opened at all - they are already past the inactivity
+# threshold, so their mtime stands in for last_activity and status is None.
+def recover_storage(storage_dir, checkpoint_path, prune_before=None, workers=8):
+    started = time.time()
+    checkpoint = load_checkpoint(checkpoint_path)
+    index = {}
+    to_parse = []
+    reused = 0
+    pruned = 0
+    quarantined = 0
+
+    with os.scandir(storage_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+
+            if entry.name.endswith(TEMP_SUFFIX):
+                if started - stat.st_mtime > STALE_TEMP_SECONDS and quarantine_file(storage_dir, entry.name):
+                    quarantined += 1
+                continue
+            if not entry.name.endswith('.json'):
+                continue
+
+            game_id = entry.name[:-5]
+            if prune_before is not None and stat.st_mtime < prune_before:
+                index[game_id] = {
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'status': None,
+                    'last_activity': stat.st_mtime,
+                }
+                pruned += 1
+                continue
+
+            cached = checkpoint.get(game_id)
+            if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                index[game_id] = cached
+                reused += 1
+            else:
+                to_parse.append((game_id, entry.name, entry.path, stat))
+
+    def parse(item):
+        game_id, filename, path, stat = item
+        try:
+            return item, parse_header(path, stat.st_size)
+        except FileNotFoundError:
+            # Deleted by another worker while we were scanning
+            return item, False
+
+    if to_parse:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (game_id, filename, path, stat), header in executor.map(parse, to_parse):
+                if header is False:
+                    continue
+                if header is None:
+                    if quarantine_file(storage_dir, filename):
+                        quarantined += 1
+                    continue
+                index[game_id] = {
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'status': header[0],
+                    'last_activity': header[1],
+                }
+
+    save_checkpoint(checkpoint_path, {
+        game_id: entry for game_id, entry in index.items() if entry['status'] is not None
+    })
+
+    logger.info(
+        f"Recovered index of {len(index)} games in {(time.time() - started) * 1000:.1f}ms "
+        f"({len(to_parse)} parsed, {reused} from checkpoint, "
+        f"{pruned} pruned, {quarantined} quarantined)"
+    )
+    return index
@@ -0,0 +1,99 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_archive import aggregate_archive, archive_game, iter_archive_lines
+
+
+def finished_game(winner=1, shots=(20, 19), hits=(17, 9)):
+    return {
+        'status': 'game_over',
+        'winner': winner,
+        'first_turn': 1,
+        'created_at': 100,
+        'last_activity': 160,
+        'stats': {
+            '1': {'shots': shots[0], 'hits': hits[0], 'misses': shots[0] - hits[0]},
+            '2': {'shots': shots[1], 'hits': hits[1], 'misses': shots[1] - hits[1]},
+        },
+    }
+
+
+def write_archive(path, count):
+    for i in range(count):
+        assert archive_game(path, f"G{i}", finished_game(winner=1 + i % 2))
+
+
+def test_aggregate_totals(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    write_archive(path, 4)
+    stats = aggregate_archive(path)
+
+    assert stats['games'] == 4
+    assert stats['skipped_lines'] == 0
+    assert stats['shots'] == 4 * 39
+    assert stats['hits'] == 4 * 26
+    assert stats['first_mover_wins'] == 2
+    assert stats['first_mover_win_rate'] == 0.5
+    assert stats['length_histogram'] == {'30-39': 4}
+    assert stats['average_duration_seconds'] == 60
+
+
+def test_chunk_size_does_not_change_results(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    write_archive(path, 25)
+    expected = aggregate_archive(path)
+
+    for chunk_size in (1, 7, 64, 1 << 20):
+        assert aggregate_archive(path, chunk_size=chunk_size) == expected
+
+
+def test_lines_split_across_chunks_are_rejoined(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    write_archive(path, 3)
+    with open(path, 'rb') as f:
+        expected = [line for line in f.read().split(b'\n') if line]
+    assert list(iter_archive_lines(path, chunk_size=5)) == expected
+
+
+def test_malformed_lines_are_skipped(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    write_archive(path, 2)
+    with open(path, 'ab') as f:
+        f.write(b'too\tfew\tfields\n')
+        f.write(b'G9\tgame_over\tx\t1\t0\t0\t1\t1\t0\t1\t1\t0\n')
+        f.write(b'G9\tbogus\t1\t1\t0\t0\t1\t1\t0\t1\t1\t0\n')
+    stats = aggregate_archive(path)
+    assert stats['games'] == 2
+    assert stats['skipped_lines'] == 3
+
+
+def test_half_written_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    write_archive(path, 2)
+    with open(path, 'ab') as f:
+        f.write(b'G9\tgame_over\t1')
+    stats = aggregate_archive(path)
+    assert stats['games'] == 2
+    assert stats['skipped_lines'] == 0
+
+
+def test_append_after_half_written_line_keeps_the_new_record(tmp_path):
+    path = str(tmp_path / 'archive.tsv')
+    archive_game(path, 'A', finished_game())
+    with open(path, 'ab') as f:
+        f.write(b'B\tgame_over\t1\t1\t100')
+    archive_game(path, 'C', finished_game(winner=2))
+
+    stats = aggregate_archive(path)
+    assert stats['games'] == 2
+    assert stats['skipped_lines'] == 1
+    assert stats['decided_games'] == 2
+    assert stats['first_mover_wins'] == 1
+
+
+def test_missing_archive_is_empty(tmp_path):
+    stats = aggregate_archive(str(tmp_path / 'missing.tsv'))
+    assert stats['games'] == 0
+    assert stats['hit_rate'] == 0.0
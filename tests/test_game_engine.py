@@ -0,0 +1,116 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_engine import SHIP_SIZES, play_game, random_bot_ships, resolve_shot, ship_cells
+from simulate import make_shards, merge_totals, new_totals, run_shard
+
+
+def small_fleet():
+    return {
+        'destroyer': [(0, 0), (0, 1)],
+        'submarine': [(2, 0), (3, 0), (4, 0)],
+    }
+
+
+def test_miss():
+    hits = set()
+    assert resolve_shot(small_fleet(), hits, 9, 9) == (False, None, False, False)
+    assert hits == set()
+
+
+def test_hit_without_sinking():
+    hits = set()
+    assert resolve_shot(small_fleet(), hits, 0, 0) == (True, 'destroyer', False, False)
+    assert hits == {(0, 0)}
+
+
+def test_hit_that_sinks():
+    hits = {(0, 0)}
+    assert resolve_shot(small_fleet(), hits, 0, 1) == (True, 'destroyer', True, False)
+
+
+def test_last_sink_ends_the_game():
+    hits = {(0, 0), (0, 1), (2, 0), (3, 0)}
+    assert resolve_shot(small_fleet(), hits, 4, 0) == (True, 'submarine', True, True)
+
+
+def test_resolve_shot_on_stored_ships():
+    # The route passes ships as stored in the game file
+    ships = ship_cells({'destroyer': [{'row': 5, 'col': 5}, {'row': 5, 'col': 6}]})
+    hits = {(5, 5)}
+    assert resolve_shot(ships, hits, 5, 6) == (True, 'destroyer', True, True)
+
+
+def test_random_bot_ships_places_a_full_fleet_without_overlap():
+    ships = random_bot_ships(random.Random(3))
+    assert {ship: len(coords) for ship, coords in ships.items()} == SHIP_SIZES
+    cells = [(c['row'], c['col']) for coords in ships.values() for c in coords]
+    assert len(cells) == len(set(cells))
+    assert all(0 <= row < 10 and 0 <= col < 10 for row, col in cells)
+
+
+def test_play_game_is_deterministic_for_a_seed():
+    first = play_game(random.Random('7:0'), ('hunt', 'random'))
+    second = play_game(random.Random('7:0'), ('hunt', 'random'))
+    assert first == second
+    winner_stats = first['stats'][str(first['winner'])]
+    assert winner_stats['hits'] == sum(SHIP_SIZES.values())
+
+
+def test_totals_do_not_depend_on_shard_split():
+    def totals_for(shard_size):
+        totals = new_totals()
+        for shard in make_shards(60, shard_size, 11, ('hunt', 'hunt-reset'), 'alternate'):
+            merge_totals(totals, run_shard(shard))
+        return totals
+
+    expected = totals_for(60)
+    assert expected['games'] == 60
+    assert totals_for(7) == expected
+    assert totals_for(1) == expected
+
+
+# The hit/sunk/game-over checks multiplayer_make_shot used before it switched
+# to resolve_shot, kept here to show the rules did not change
+def old_route_rules(opponent_ships, hit_records, shot_row, shot_col):
+    hit = False
+    hit_ship_type = None
+    for ship_type, coords in opponent_ships.items():
+        for coord in coords:
+            if coord.get('row') == shot_row and coord.get('col') == shot_col:
+                hit = True
+                hit_ship_type = ship_type
+                break
+        if hit:
+            break
+    if hit:
+        hit_records.append({'row': shot_row, 'col': shot_col, 'ship_type': hit_ship_type})
+
+    def coords_sunk(coords):
+        return all(any(h.get('row') == c.get('row') and h.get('col') == c.get('col')
+                       for h in hit_records) for c in coords)
+
+    sunk = hit and coords_sunk(opponent_ships[hit_ship_type])
+    game_over = hit and all(coords_sunk(coords) for coords in opponent_ships.values())
+    return hit, hit_ship_type, sunk, game_over
+
+
+def test_resolve_shot_matches_old_route_rules():
+    rng = random.Random(5)
+    for _ in range(50):
+        fleet = random_bot_ships(rng)
+        ships = ship_cells(fleet)
+        hits = set()
+        hit_records = []
+        cells = [(row, col) for row in range(10) for col in range(10)]
+        rng.shuffle(cells)
+        for row, col in cells:
+            result = resolve_shot(ships, hits, row, col)
+            assert result == old_route_rules(fleet, hit_records, row, col)
+            if result[3]:
+                break
+        else:
+            raise AssertionError('game never ended')
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_table import SharedGameTable
+
+
+def waiting_game():
+    return {
+        'players': {'1': {'ready': False}},
+        'status': 'waiting',
+        'current_turn': None,
+        'player_ships': {},
+        'shots': {'1': {'hits': [], 'misses': []}, '2': {'hits': [], 'misses': []}},
+        'created_at': 1.0,
+        'last_activity': 2.0,
+    }
+
+
+def test_threads_never_share_a_slot(tmp_path):
+    table = SharedGameTable(str(tmp_path / 'games.tbl'), slots=2048)
+    results = []
+
+    # Switch threads as often as possible to make the race show up
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def worker(thread):
+        for i in range(200):
+            results.append(table.save(f"T{thread}G{i}", waiting_game()))
+
+    try:
+        threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert all(results)
+    game_ids = table.game_ids()
+    assert len(game_ids) == 1600
+    assert len(set(game_ids)) == 1600
+
+
+def race_shared_games(path, barrier):
+    table = SharedGameTable(path)
+    barrier.wait()
+    for i in range(30):
+        table.save(f"SHARED{i}", waiting_game())
+
+
+def test_processes_never_add_a_game_twice(tmp_path):
+    context = multiprocessing.get_context('fork')
+    for round in range(3):
+        path = str(tmp_path / f"games{round}.tbl")
+        SharedGameTable(path, slots=4096)
+
+        # Every worker misses each game and races the others to add it
+        barrier = context.Barrier(6)
+        workers = [context.Process(target=race_shared_games, args=(path, barrier)) for _ in range(6)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+
+        game_ids = SharedGameTable(path).game_ids()
+        assert sorted(game_ids) == sorted(f"SHARED{i}" for i in range(30))
+
+
+def test_only_one_delete_wins(tmp_path):
+    table = SharedGameTable(str(tmp_path / 'games.tbl'), slots=16)
+    other = SharedGameTable(str(tmp_path / 'games.tbl'))
+    assert table.save('ABC123', waiting_game())
+
+    assert other.delete('ABC123') is True
+    assert table.delete('ABC123') is False
+    assert table.load('ABC123') is None
+
+
+def test_missing_game_skips_rescan_until_table_changes(tmp_path):
+    table = SharedGameTable(str(tmp_path / 'games.tbl'), slots=16)
+    other = SharedGameTable(str(tmp_path / 'games.tbl'))
+
+    assert table.load('NOPE') is None
+    scanned = table.index_generation
+    assert table.load('NOPE') is None
+    assert table.index_generation == scanned
+
+    # A game added by another worker is found after its generation bump
+    assert other.save('NEW1', waiting_game())
+    assert table.load('NEW1') == waiting_game()
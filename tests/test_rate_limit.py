@@ -0,0 +1,96 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import FileBackend, MemoryBackend, RateLimiter, retry_after_seconds, take_token
+
+
+def test_take_token_starts_full_and_refills():
+    state, wait = take_token(None, rate=1, capacity=2, now=10.0)
+    assert (state, wait) == ((1.0, 10.0), 0.0)
+    state, wait = take_token(state, rate=1, capacity=2, now=10.0)
+    assert (state, wait) == ((0.0, 10.0), 0.0)
+
+    # Empty bucket: nothing taken, wait until the next token
+    state, wait = take_token(state, rate=2, capacity=2, now=10.25)
+    assert state == (0.5, 10.25)
+    assert wait == 0.25
+
+    # Refill never goes over capacity
+    state, wait = take_token(state, rate=2, capacity=2, now=100.0)
+    assert (state, wait) == ((1.0, 100.0), 0.0)
+
+
+def test_retry_after_is_whole_seconds():
+    assert retry_after_seconds(0.02) == 1
+    assert retry_after_seconds(1.2) == 2
+
+
+def test_file_backend_keeps_colliding_keys_apart(tmp_path):
+    # With only PROBE_SLOTS slots every key shares the same probe window
+    backend = FileBackend(str(tmp_path / 'limits'), slots=FileBackend.PROBE_SLOTS)
+    keys = [f"session:{i}" for i in range(FileBackend.PROBE_SLOTS)]
+
+    assert [backend.take(key, 1, 1, 100.0) for key in keys] == [0.0] * len(keys)
+    assert [backend.take(key, 1, 1, 100.0) for key in keys] == [1.0] * len(keys)
+
+
+def test_file_backend_takes_over_least_recently_used_slot(tmp_path):
+    backend = FileBackend(str(tmp_path / 'limits'), slots=FileBackend.PROBE_SLOTS)
+    for i in range(FileBackend.PROBE_SLOTS):
+        backend.take(f"old:{i}", 1, 1, 100.0 + i)
+
+    # A new key evicts old:0, the least recently used bucket
+    assert backend.take('new', 1, 1, 200.0) == 0.0
+    assert backend.take('new', 1, 1, 200.0) == 1.0
+    # old:0 comes back with a fresh, full bucket
+    assert backend.take('old:0', 1, 1, 100.5) == 0.0
+    # The other buckets kept their state
+    assert backend.take(f"old:{FileBackend.PROBE_SLOTS - 1}", 1, 1, 107.0) == 1.0
+
+
+def test_file_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'limits')
+    first = FileBackend(path)
+    second = FileBackend(path)
+    assert first.take('key', 1, 1, 100.0) == 0.0
+    assert second.take('key', 1, 1, 100.0) == 1.0
+
+
+def test_check_stops_at_first_rejecting_rule():
+    limiter = RateLimiter(MemoryBackend())
+    spammer = [('session:1', 1, 1), ('game:G', 1, 2)]
+    opponent = [('session:2', 1, 1), ('game:G', 1, 2)]
+
+    assert limiter.check('state', spammer) == 0.0
+    # The spammer's session bucket is empty, so the game bucket is left alone
+    for _ in range(10):
+        assert limiter.check('state', spammer) > 0
+    assert limiter.check('state', opponent) == 0.0
+
+
+def test_counters_are_shared_with_file_backend(tmp_path):
+    path = str(tmp_path / 'limits')
+    first = RateLimiter(FileBackend(path))
+    second = RateLimiter(FileBackend(path))
+
+    first.check('state', [('session:1', 1, 1)])
+    second.check('state', [('session:1', 1, 1)])
+    second.check('shot', [('session:1', 1, 1)])
+
+    counters = first.counters()
+    assert counters['allowed'] == {'state': 1, 'shot': 1}
+    assert counters['throttled'] == {'state': 1, 'shot': 0}
+    assert counters['scope'] == 'all workers'
+    assert counters['pid'] == os.getpid()
+
+
+def test_memory_counters_are_per_worker():
+    limiter = RateLimiter(MemoryBackend())
+    limiter.check('state', [('session:1', 1, 1)])
+    limiter.check('state', [('session:1', 1, 1)])
+    counters = limiter.counters()
+    assert counters['allowed'] == {'state': 1}
+    assert counters['throttled'] == {'state': 1}
+    assert counters['scope'] == 'this worker'
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage_recovery
+from storage_recovery import (
+    HEADER_BYTES, QUARANTINE_DIR_NAME, STALE_TEMP_SECONDS, quarantine_file, recover_storage,
+)
+
+
+def write_game(storage_dir, game_id, status='playing', last_activity=1000.0, **extra):
+    game = {'status': status, 'last_activity': last_activity, 'created_at': 900.0}
+    game.update(extra)
+    with open(os.path.join(storage_dir, f"{game_id}.json"), 'w') as f:
+        json.dump(game, f)
+
+
+def set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def quarantined(storage_dir):
+    quarantine_dir = os.path.join(storage_dir, QUARANTINE_DIR_NAME)
+    if not os.path.isdir(quarantine_dir):
+        return []
+    return sorted(os.listdir(quarantine_dir))
+
+
+def test_recovers_status_and_last_activity(tmp_path):
+    storage_dir = str(tmp_path)
+    write_game(storage_dir, 'A', 'waiting', 1234.5)
+    write_game(storage_dir, 'B', 'game_over', 99.0)
+
+    index = recover_storage(storage_dir, str(tmp_path / 'index.checkpoint'))
+    assert index['A']['status'] == 'waiting'
+    assert index['A']['last_activity'] == 1234.5
+    assert index['B']['status'] == 'game_over'
+
+
+def test_truncated_file_is_quarantined(tmp_path):
+    storage_dir = str(tmp_path)
+    write_game(storage_dir, 'GOOD')
+    with open(os.path.join(storage_dir, 'BAD.json'), 'w') as f:
+        f.write('{"status": "playing", "last_activity": 1000.0, "board')
+
+    index = recover_storage(storage_dir, str(tmp_path / 'index.checkpoint'))
+    assert set(index) == {'GOOD'}
+    assert not os.path.exists(os.path.join(storage_dir, 'BAD.json'))
+    assert [name.split('.json')[0] for name in quarantined(storage_dir)] == ['BAD']
+
+
+def test_only_stale_temp_files_are_quarantined(tmp_path):
+    storage_dir = str(tmp_path)
+    stale = os.path.join(storage_dir, 'OLD.json.abc.tmp')
+    fresh = os.path.join(storage_dir, 'NEW.json.def.tmp')
+    for path in (stale, fresh):
+        with open(path, 'w') as f:
+            f.write('{')
+    set_mtime(stale, time.time() - STALE_TEMP_SECONDS - 10)
+
+    index = recover_storage(storage_dir, str(tmp_path / 'index.checkpoint'))
+    assert index == {}
+    assert not os.path.exists(stale)
+    # A fresh temp file may belong to a save that is still in progress
+    assert os.path.exists(fresh)
+    assert len(quarantined(storage_dir)) == 1
+
+
+def test_pruned_files_are_never_opened(tmp_path, monkeypatch):
+    storage_dir = str(tmp_path)
+    path = os.path.join(storage_dir, 'OLD.json')
+    with open(path, 'w') as f:
+        f.write('not json at all')
+    old = time.time() - 7200
+    set_mtime(path, old)
+
+    def fail(path, size):
+        raise AssertionError(f"parsed pruned file {path}")
+    monkeypatch.setattr(storage_recovery, 'parse_header', fail)
+
+    index = recover_storage(storage_dir, str(tmp_path / 'index.checkpoint'),
+                            prune_before=time.time() - 3600)
+    assert index['OLD']['status'] is None
+    assert abs(index['OLD']['last_activity'] - old) < 1
+    # Garbage content is only noticed when the file is actually loaded
+    assert os.path.exists(path)
+    assert quarantined(storage_dir) == []
+
+
+def test_checkpoint_is_reused_for_unchanged_files(tmp_path, monkeypatch):
+    storage_dir = str(tmp_path)
+    checkpoint_path = str(tmp_path / 'index.checkpoint')
+    write_game(storage_dir, 'A', 'playing', 10.0)
+    write_game(storage_dir, 'B', 'waiting', 20.0)
+    first = recover_storage(storage_dir, checkpoint_path)
+
+    # Change B only - it is the one file that should be parsed again
+    write_game(storage_dir, 'B', 'playing', 25.0, extra_field='x')
+    parsed = []
+    parse_header = storage_recovery.parse_header
+
+    def counting(path, size):
+        parsed.append(os.path.basename(path))
+        return parse_header(path, size)
+    monkeypatch.setattr(storage_recovery, 'parse_header', counting)
+
+    second = recover_storage(storage_dir, checkpoint_path)
+    assert parsed == ['B.json']
+    assert second['A'] == first['A']
+    assert second['B']['status'] == 'playing'
+    assert second['B']['last_activity'] == 25.0
+
+
+def test_old_layout_falls_back_to_full_parse(tmp_path):
+    storage_dir = str(tmp_path)
+    # Header fields after a large board, as written before the header-first layout
+    game = {'board': 'x' * (HEADER_BYTES * 2), 'status': 'game_over', 'last_activity': 42.0}
+    with open(os.path.join(storage_dir, 'LEGACY.json'), 'w') as f:
+        json.dump(game, f)
+
+    index = recover_storage(storage_dir, str(tmp_path / 'index.checkpoint'))
+    assert index['LEGACY']['status'] == 'game_over'
+    assert index['LEGACY']['last_activity'] == 42.0
+    assert quarantined(storage_dir) == []
+
+
+def test_quarantine_keeps_files_with_the_same_name(tmp_path):
+    storage_dir = str(tmp_path)
+    for content in ('{"first', '{"second'):
+        with open(os.path.join(storage_dir, 'DUP.json'), 'w') as f:
+            f.write(content)
+        assert quarantine_file(storage_dir, 'DUP.json')
+
+    names = quarantined(storage_dir)
+    assert len(names) == 2
+    contents = set()
+    for name in names:
+        with open(os.path.join(storage_dir, QUARANTINE_DIR_NAME, name)) as f:
+            contents.add(f.read())
+    assert contents == {'{"first', '{"second'}
+
+
+def test_quarantine_of_missing_file_is_not_an_error(tmp_path):
+    assert not quarantine_file(str(tmp_path), 'GONE.json')